@@ -0,0 +1,34 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Fixtures for the SMTP Integrator charm unit tests."""
+
+import ops
+import pytest
+from ops.testing import Harness
+
+from charm import SmtpIntegratorOperatorCharm
+
+
+@pytest.fixture(name="harness")
+def harness_fixture():
+    """Provide a Harness for the charm, cleaned up after the test."""
+    harness = Harness(SmtpIntegratorOperatorCharm)
+    yield harness
+    harness.cleanup()
+
+
+@pytest.fixture(name="juju3")
+def juju3_fixture(monkeypatch):
+    """Mimic a Juju 3 environment, where secrets are supported."""
+    version = ops.JujuVersion("3.1.0")
+    monkeypatch.setattr(ops.JujuVersion, "from_environ", lambda: version)
+    yield version
+
+
+@pytest.fixture(name="juju2")
+def juju2_fixture(monkeypatch):
+    """Mimic a Juju 2 environment, where secrets are not supported."""
+    version = ops.JujuVersion("2.9.0")
+    monkeypatch.setattr(ops.JujuVersion, "from_environ", lambda: version)
+    yield version
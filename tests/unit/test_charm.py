@@ -3,277 +3,218 @@
 
 """Unit tests."""
 
-import secrets
-from unittest.mock import MagicMock, patch
-
 import ops
+import pytest
 from ops.testing import Harness
 
-from charm import SmtpIntegratorOperatorCharm
-
 MINIMAL_CHARM_CONFIG = {
     "host": "smtp.example",
     "port": 25,
 }
 MINIMAL_CHARM_CONFIG_WITH_PASSWORD = {
     **MINIMAL_CHARM_CONFIG,
-    "password": secrets.token_hex(),
+    "password": "deadbeef" * 8,  # nosec
 }
 
 
-def test_unconfigured_charm_reaches_blocked_status():
-    """
-    arrange: set up a charm without configuration.
-    act: none
-    assert: the charm reaches BlockedStatus.
-    """
-    harness = Harness(SmtpIntegratorOperatorCharm)
-    harness.begin()
-    assert harness.model.unit.status.name == ops.BlockedStatus().name
+def _get_app_data(harness: Harness, relation_name: str) -> ops.RelationDataContent:
+    """Get the charm application databag for a relation.
 
+    Args:
+        harness: the harness running the charm.
+        relation_name: the name of the relation.
 
-def test_misconfigured_port_charm_reaches_blocked_status():
-    """
-    arrange: set up a charm with an invalid port.
-    act: none
-    assert: the charm reaches BlockedStatus.
-    """
-    harness = Harness(SmtpIntegratorOperatorCharm)
-    harness.update_config(
-        {
-            "host": "smtp.example",
-            "port": 0,
-        }
-    )
-    harness.begin()
-    assert harness.model.unit.status.name == ops.BlockedStatus().name
-
-
-def test_misconfigured_auth_type_charm_reaches_blocked_status():
-    """
-    arrange: set up a charm ith an invalid auth type.
-    act: none
-    assert: the charm reaches BlockedStatus.
+    Returns:
+        the application databag of the relation.
     """
-    harness = Harness(SmtpIntegratorOperatorCharm)
-    harness.update_config(
-        {
-            **MINIMAL_CHARM_CONFIG,
-            "auth_type": "nonexisting",
-        }
-    )
-    harness.begin()
-    assert harness.model.unit.status.name == ops.BlockedStatus().name
+    relation = harness.model.get_relation(relation_name)
+    assert relation
+    return relation.data[harness.model.app]
 
 
-def test_misconfigured_transport_security_charm_reaches_blocked_status():
+@pytest.mark.parametrize(
+    "config",
+    [
+        pytest.param({}, id="unconfigured"),
+        pytest.param({"host": "smtp.example", "port": 0}, id="port"),
+        pytest.param({**MINIMAL_CHARM_CONFIG, "auth_type": "nonexisting"}, id="auth_type"),
+        pytest.param(
+            {**MINIMAL_CHARM_CONFIG, "transport_security": "nonexisting"},
+            id="transport_security",
+        ),
+    ],
+)
+def test_misconfigured_charm_reaches_blocked_status(harness, config):
     """
-    arrange: set up a charm with an invalid transport security.
+    arrange: set up a charm with a missing or invalid configuration.
     act: none
     assert: the charm reaches BlockedStatus.
     """
-    harness = Harness(SmtpIntegratorOperatorCharm)
-    harness.update_config(
-        {
-            **MINIMAL_CHARM_CONFIG,
-            "transport_security": "nonexisting",
-        }
-    )
+    harness.update_config(config)
     harness.begin()
     assert harness.model.unit.status.name == ops.BlockedStatus().name
 
 
-def test_charm_reaches_active_status():
+def test_charm_reaches_active_status(harness):
     """
     arrange: set up a charm with minimal valid configuration.
     act: trigger a configuration change with the required configs.
     assert: the charm reaches ActiveStatus.
     """
-    harness = Harness(SmtpIntegratorOperatorCharm)
     harness.update_config(MINIMAL_CHARM_CONFIG)
     harness.begin()
     harness.charm.on.config_changed.emit()
     assert harness.model.unit.status == ops.ActiveStatus()
 
 
-def test_legacy_relation_joined_populates_data():
+def test_legacy_relation_joined_populates_data(harness):
     """
     arrange: set up a charm with valid configuration and leadership for the unit.
     act: add an smtp-legacy relation.
     assert: the smtp-legacy relation gets populated with the SMTP data.
     """
-    harness = Harness(SmtpIntegratorOperatorCharm)
     harness.set_leader(True)
     harness.update_config(MINIMAL_CHARM_CONFIG_WITH_PASSWORD)
     harness.begin()
     harness.add_relation("smtp-legacy", "example")
-    data = harness.model.get_relation("smtp-legacy").data[harness.model.app]
+    data = _get_app_data(harness, "smtp-legacy")
     assert data["host"] == MINIMAL_CHARM_CONFIG_WITH_PASSWORD["host"]
     assert data["port"] == str(MINIMAL_CHARM_CONFIG_WITH_PASSWORD["port"])
     assert data["password"] == MINIMAL_CHARM_CONFIG_WITH_PASSWORD["password"]
 
 
-def test_config_changed_joined_populates_data():
+def test_config_changed_joined_populates_data(harness):
     """
     arrange: set up a charm with valid configuration and leadership for the unit.
     act: add an smtp-legacy relation and trigger a configuration change.
     assert: the smtp-legacy relation gets populated with the SMTP data.
     """
-    harness = Harness(SmtpIntegratorOperatorCharm)
     harness.set_leader(True)
     harness.update_config(MINIMAL_CHARM_CONFIG_WITH_PASSWORD)
     harness.begin()
-    harness.add_relation("smtp-legacy", "example")
+    with harness.hooks_disabled():
+        harness.add_relation("smtp-legacy", "example")
     harness.charm.on.config_changed.emit()
-    data = harness.model.get_relation("smtp-legacy").data[harness.model.app]
+    data = _get_app_data(harness, "smtp-legacy")
     assert data["host"] == MINIMAL_CHARM_CONFIG_WITH_PASSWORD["host"]
     assert data["port"] == str(MINIMAL_CHARM_CONFIG_WITH_PASSWORD["port"])
     assert data["password"] == MINIMAL_CHARM_CONFIG_WITH_PASSWORD["password"]
 
 
-def test_legacy_relation_joined_doesnt_populate_password_id():
+def test_legacy_relation_joined_doesnt_populate_password_id(harness):
     """
     arrange: set up a charm with valid configuration and leadership for the unit.
     act: add an smtp-legacy relation.
     assert: the smtp-legacy relation does not get populated with the password_id.
     """
-    harness = Harness(SmtpIntegratorOperatorCharm)
     harness.set_leader(True)
     harness.update_config(MINIMAL_CHARM_CONFIG_WITH_PASSWORD)
     harness.begin()
     harness.add_relation("smtp-legacy", "example")
-    data = harness.model.get_relation("smtp-legacy").data[harness.model.app]
+    data = _get_app_data(harness, "smtp-legacy")
     assert "password_id" not in data
 
 
-@patch.object(ops.JujuVersion, "from_environ")
-def test_relation_joined_when_secrets_enabled_populates_data(mock_juju_env):
+@pytest.mark.usefixtures("juju3")
+def test_relation_joined_when_secrets_enabled_populates_data(harness):
     """
     arrange: set up a charm with valid configuration mimicking Juju 3 and leadership for the unit.
     act: add an smtp relation.
     assert: the smtp relation gets populated with the SMTP data.
     """
-    mock_juju_env.return_value = MagicMock(has_secrets=True)
-    harness = Harness(SmtpIntegratorOperatorCharm)
     harness.set_leader(True)
     harness.update_config(MINIMAL_CHARM_CONFIG_WITH_PASSWORD)
     harness.begin()
     harness.add_relation("smtp-peers", harness.charm.app.name)
     harness.add_relation("smtp", "example")
-    data = harness.model.get_relation("smtp").data[harness.model.app]
+    data = _get_app_data(harness, "smtp")
     assert data["host"] == MINIMAL_CHARM_CONFIG_WITH_PASSWORD["host"]
     assert data["port"] == str(MINIMAL_CHARM_CONFIG_WITH_PASSWORD["port"])
     assert data["password_id"] is not None
 
 
-@patch.object(ops.JujuVersion, "from_environ")
-def test_config_changed_when_secrets_enabled_populates_data(mock_juju_env):
+@pytest.mark.usefixtures("juju3")
+def test_config_changed_when_secrets_enabled_populates_data(harness):
     """
     arrange: set up a charm with valid configuration mimicking Juju 3 and leadership for the unit.
     act: add an smtp relation and trigger a configuration change.
     assert: the smtp relation gets populated with the SMTP data.
     """
-    mock_juju_env.return_value = MagicMock(has_secrets=True)
-    harness = Harness(SmtpIntegratorOperatorCharm)
     harness.set_leader(True)
     harness.update_config(MINIMAL_CHARM_CONFIG_WITH_PASSWORD)
     harness.begin()
     harness.add_relation("smtp-peers", harness.charm.app.name)
     harness.add_relation("smtp", "example")
     harness.charm.on.config_changed.emit()
-    data = harness.model.get_relation("smtp").data[harness.model.app]
+    data = _get_app_data(harness, "smtp")
     assert data["host"] == MINIMAL_CHARM_CONFIG_WITH_PASSWORD["host"]
     assert data["port"] == str(MINIMAL_CHARM_CONFIG_WITH_PASSWORD["port"])
     assert data["password_id"] is not None
 
 
-@patch.object(ops.JujuVersion, "from_environ")
-def test_relation_joined_when_secrets_enabled_doesnt_populate_password(mock_juju_env):
+@pytest.mark.usefixtures("juju3")
+def test_relation_joined_when_secrets_enabled_doesnt_populate_password(harness):
     """
     arrange: set up a charm with valid configuration mimicking Juju 3 and leadership for the unit.
     act: add an smtp relation.
     assert: the smtp relation does not populate with the password.
     """
-    mock_juju_env.return_value = MagicMock(has_secrets=True)
-    harness = Harness(SmtpIntegratorOperatorCharm)
     harness.set_leader(True)
     harness.update_config(MINIMAL_CHARM_CONFIG_WITH_PASSWORD)
     harness.begin()
     harness.add_relation("smtp-peers", harness.charm.app.name)
     harness.add_relation("smtp", "example")
-    data = harness.model.get_relation("smtp").data[harness.model.app]
+    data = _get_app_data(harness, "smtp")
     assert "password" not in data
 
 
-@patch.object(ops.JujuVersion, "from_environ")
-def test_relation_joined_when_no_secrets_enabled(mock_juju_env):
+@pytest.mark.usefixtures("juju2")
+def test_relation_joined_when_no_secrets_enabled(harness):
     """
     arrange: set up a charm with valid configuration mimicking Juju 2 and leadership for the unit.
     act: add an smtp relation.
     assert: the smtp relation does not get populated with the SMTP data.
     """
-    mock_juju_env.return_value = MagicMock(has_secrets=False)
-    harness = Harness(SmtpIntegratorOperatorCharm)
     harness.set_leader(True)
     harness.update_config(MINIMAL_CHARM_CONFIG_WITH_PASSWORD)
     harness.begin()
     harness.add_relation("smtp", "example")
-    data = harness.model.get_relation("smtp").data[harness.model.app]
+    data = _get_app_data(harness, "smtp")
     assert data == {}
 
 
-@patch.object(ops.JujuVersion, "from_environ")
-def test_relation_joined_when_no_password_configured(mock_juju_env):
+@pytest.mark.usefixtures("juju3")
+def test_relation_joined_when_no_password_configured(harness):
     """
     arrange: set up a configured charm mimicking Juju 3 and leadership for the unit.
     act: add an smtp relation.
     assert: the relation gets populated with the SMTP data and the password_id is not present.
     """
-    mock_juju_env.return_value = MagicMock(has_secrets=True)
-    harness = Harness(SmtpIntegratorOperatorCharm)
     harness.set_leader(True)
     harness.update_config(MINIMAL_CHARM_CONFIG)
     harness.begin()
     harness.add_relation("smtp-peers", harness.charm.app.name)
     harness.add_relation("smtp", "example")
-    data = harness.model.get_relation("smtp").data[harness.model.app]
+    data = _get_app_data(harness, "smtp")
     assert data["host"] == MINIMAL_CHARM_CONFIG["host"]
     assert data["port"] == str(MINIMAL_CHARM_CONFIG["port"])
     assert "password" not in data
     assert "password_id" not in data
 
 
-def test_legacy_relation_joined_when_not_leader():
+@pytest.mark.parametrize("endpoint", ["smtp", "smtp-legacy"])
+@pytest.mark.usefixtures("juju3")
+def test_relation_not_populated_when_not_leader(endpoint, harness):
     """
     arrange: set up a charm mimicking Juju 3 and unset leadership for the unit.
-    act: add an smtp-legacy relation.
-    assert: the smtp-legacy relation does not get populated with the SMTP data.
+    act: add a relation for the given endpoint.
+    assert: the relation does not get populated with the SMTP data.
     """
-    harness = Harness(SmtpIntegratorOperatorCharm)
     harness.set_leader(False)
     harness.update_config(MINIMAL_CHARM_CONFIG)
     harness.begin()
     harness.add_relation("smtp-peers", harness.charm.app.name)
     harness.charm.on.config_changed.emit()
-    harness.add_relation("smtp-legacy", "example")
-    data = harness.model.get_relation("smtp-legacy").data[harness.model.app]
-    assert data == {}
-
-
-@patch.object(ops.JujuVersion, "from_environ")
-def test_relation_joined_when_not_leader(mock_juju_env):
-    """
-    arrange: set up a charm mimicking Juju 3 and unset leadership for the unit.
-    act: add an smtp relation.
-    assert: the smtp relation does not get populated with the SMTP data.
-    """
-    mock_juju_env.return_value = MagicMock(has_secrets=True)
-    harness = Harness(SmtpIntegratorOperatorCharm)
-    harness.set_leader(False)
-    harness.update_config(MINIMAL_CHARM_CONFIG)
-    harness.begin()
-    harness.add_relation("smtp-peers", harness.charm.app.name)
-    harness.charm.on.config_changed.emit()
-    harness.add_relation("smtp", "example")
-    data = harness.model.get_relation("smtp").data[harness.model.app]
+    harness.add_relation(endpoint, "example")
+    data = _get_app_data(harness, endpoint)
     assert data == {}
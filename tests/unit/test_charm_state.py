@@ -3,45 +3,46 @@
 
 """CharmState unit tests."""
 
-from unittest.mock import MagicMock
+from types import MappingProxyType, SimpleNamespace
 
 import pytest
 
 from charm_state import CharmConfigInvalidError, CharmState
 
 
-def test_charm_state_from_charm():
+@pytest.fixture(scope="module", name="valid_charm")
+def valid_charm_fixture():
+    """Provide a charm stand-in with a complete, valid configuration."""
+    yield SimpleNamespace(
+        config=MappingProxyType(
+            {
+                "host": "example.smtp",
+                "port": 25,
+                "auth_type": "plain",
+                "transport_security": "tls",
+                "user": "example_user",
+                "password": "somepassword",  # nosec
+                "domain": "domain",
+            }
+        )
+    )
+
+
+def test_charm_state_from_charm(valid_charm):
     """
     arrange: set up a configured charm
     act: access the status properties
     assert: the configuration is accessible from the state properties.
     """
-    host = "example.smtp"
-    port = 25
-    user = "example_user"
-    password = "somepassword"  # nosec
-    auth_type = "plain"
-    transport_security = "tls"
-    domain = "domain"
-    charm = MagicMock(
-        config={
-            "host": host,
-            "port": port,
-            "user": user,
-            "password": password,
-            "auth_type": auth_type,
-            "transport_security": transport_security,
-            "domain": domain,
-        }
-    )
-    state = CharmState.from_charm(charm)
-    assert state.host == host
-    assert state.port == port
-    assert state.user == user
-    assert state.password == password
-    assert state.auth_type == auth_type
-    assert state.transport_security == transport_security
-    assert state.domain == domain
+    config = valid_charm.config
+    state = CharmState.from_charm(valid_charm)
+    assert state.host == config["host"]
+    assert state.port == config["port"]
+    assert state.user == config["user"]
+    assert state.password == config["password"]
+    assert state.auth_type == config["auth_type"]
+    assert state.transport_security == config["transport_security"]
+    assert state.domain == config["domain"]
 
 
 def test_charm_state_from_charm_with_invalid_config():
@@ -50,6 +51,6 @@ def test_charm_state_from_charm_with_invalid_config():
     act: access the status properties
     assert: a CharmConfigInvalidError is raised.
     """
-    charm = MagicMock(config={})
+    charm = SimpleNamespace(config={})
     with pytest.raises(CharmConfigInvalidError):
         CharmState.from_charm(charm)
@@ -2,8 +2,7 @@
 # See LICENSE file for licensing details.
 
 """SMTP library unit tests"""
-import secrets
-from ast import literal_eval
+from types import MappingProxyType
 
 import ops
 import pytest
@@ -28,24 +27,47 @@ provides:
     interface: smtp
 """
 
-RELATION_DATA = {
-    "host": "example.smtp",
-    "port": "25",
-    "user": "example_user",
-    "auth_type": "plain",
-    "transport_security": "tls",
-    "domain": "domain",
-    "skip_ssl_verify": "False",
-}
-
-SAMPLE_LEGACY_RELATION_DATA = {
-    **RELATION_DATA,
-    "password": secrets.token_hex(),
-}
-SAMPLE_RELATION_DATA = {
-    **RELATION_DATA,
-    "password_id": secrets.token_hex(),
-}
+RELATION_DATA = MappingProxyType(
+    {
+        "host": "example.smtp",
+        "port": "25",
+        "user": "example_user",
+        "auth_type": "plain",
+        "transport_security": "tls",
+        "domain": "domain",
+        "skip_ssl_verify": "False",
+    }
+)
+
+SMTP_DATA_FIELDS = (
+    "host",
+    "port",
+    "user",
+    "auth_type",
+    "transport_security",
+    "domain",
+    "skip_ssl_verify",
+)
+
+SAMPLE_LEGACY_RELATION_DATA = MappingProxyType(
+    {
+        **RELATION_DATA,
+        "password": "deadbeef" * 4,  # nosec
+    }
+)
+SAMPLE_RELATION_DATA = MappingProxyType(
+    {
+        **RELATION_DATA,
+        "password_id": "cafebabe" * 4,
+    }
+)
+
+EXPECTED_RELATION_DATA = MappingProxyType(
+    {
+        **SAMPLE_LEGACY_RELATION_DATA,
+        "password_id": SAMPLE_RELATION_DATA["password_id"],
+    }
+)
 
 
 class SmtpRequirerCharm(ops.CharmBase):
@@ -98,17 +120,59 @@ class SmtpProviderCharm(ops.CharmBase):
         self.events.append(event)
 
 
-def test_smtp_provider_update_relation_data():
+def _event_to_relation_data(event: smtp.SmtpDataAvailableEvent) -> smtp.SmtpRelationData:
+    """Build the relation data carried by an SmtpDataAvailable event.
+
+    Args:
+        event: the emitted event.
+
+    Returns:
+        SmtpRelationData holding the event values.
+    """
+    return smtp.SmtpRelationData(
+        host=event.host,
+        port=event.port,
+        user=event.user,
+        password=event.password,
+        password_id=event.password_id,
+        auth_type=event.auth_type,
+        transport_security=event.transport_security,
+        domain=event.domain,
+        skip_ssl_verify=event.skip_ssl_verify,
+    )
+
+
+@pytest.fixture(name="requirer_harness")
+def requirer_harness_fixture(request):
+    """Provide a started Harness for the requirer charm.
+
+    The unit is the leader unless the fixture is parametrized indirectly with False.
+    """
+    harness = Harness(SmtpRequirerCharm, meta=REQUIRER_METADATA)
+    harness.set_leader(getattr(request, "param", True))
+    harness.begin()
+    yield harness
+    harness.cleanup()
+
+
+@pytest.fixture(name="provider_harness")
+def provider_harness_fixture():
+    """Provide a started Harness for the provider charm, with the unit as leader."""
+    harness = Harness(SmtpProviderCharm, meta=PROVIDER_METADATA)
+    harness.set_leader(True)
+    harness.begin()
+    yield harness
+    harness.cleanup()
+
+
+def test_smtp_provider_update_relation_data(provider_harness):
     """
     arrange: instantiate a SmtpProviderCharm object and add an smtp-legacy relation.
     act: update the relation data.
     assert: the relation data is updated.
     """
-    harness = Harness(SmtpProviderCharm, meta=PROVIDER_METADATA)
-    harness.begin()
-    harness.set_leader(True)
-    harness.add_relation("smtp-legacy", "smtp-provider")
-    relation = harness.model.get_relation("smtp-legacy")
+    provider_harness.add_relation("smtp-legacy", "smtp-provider")
+    relation = provider_harness.model.get_relation("smtp-legacy")
     smtp_data = smtp.SmtpRelationData(
         host="example.smtp",
         port=25,
@@ -116,147 +180,121 @@ def test_smtp_provider_update_relation_data():
         transport_security="tls",
         skip_ssl_verify=False,
     )
-    harness.charm.smtp_legacy.update_relation_data(relation, smtp_data)
-    data = relation.data[harness.model.app]
-    assert data["host"] == smtp_data.host
-    assert data["port"] == str(smtp_data.port)
-    assert data["auth_type"] == smtp_data.auth_type
-    assert data["transport_security"] == smtp_data.transport_security
-    assert data["skip_ssl_verify"] == str(smtp_data.skip_ssl_verify)
-
-
-def test_smtp_relation_data_to_relation_data():
+    provider_harness.charm.smtp_legacy.update_relation_data(relation, smtp_data)
+    assert relation.data[provider_harness.model.app] == smtp_data.to_relation_data()
+
+
+@pytest.mark.parametrize(
+    "smtp_data_kwargs, expected_relation_data",
+    [
+        pytest.param(
+            {
+                "host": "example.smtp",
+                "port": 25,
+                "user": "example_user",
+                "password": EXPECTED_RELATION_DATA["password"],
+                "password_id": EXPECTED_RELATION_DATA["password_id"],
+                "auth_type": "plain",
+                "transport_security": "tls",
+                "domain": "domain",
+                "skip_ssl_verify": False,
+            },
+            EXPECTED_RELATION_DATA,
+            id="all-fields",
+        ),
+        pytest.param(
+            {
+                "host": "example.smtp",
+                "port": 25,
+                "auth_type": "none",
+                "transport_security": "none",
+            },
+            {
+                "host": "example.smtp",
+                "port": "25",
+                "auth_type": "none",
+                "transport_security": "none",
+                "skip_ssl_verify": "False",
+            },
+            id="required-fields",
+        ),
+    ],
+)
+def test_smtp_relation_data_to_relation_data(smtp_data_kwargs, expected_relation_data):
     """
     arrange: instantiate a SmtpRelationData object.
     act: obtain the relation representation.
-    assert: the relation representation is correct.
+    assert: the relation representation is correct and omits the unset optional fields.
     """
-    smtp_data = smtp.SmtpRelationData(
-        host="example.smtp",
-        port=25,
-        user="example_user",
-        password=secrets.token_hex(),
-        password_id=secrets.token_hex(),
-        auth_type="plain",
-        transport_security="tls",
-        domain="domain",
-        skip_ssl_verify=False,
-    )
-    relation_data = smtp_data.to_relation_data()
-    expected_relation_data = {
-        "host": "example.smtp",
-        "port": "25",
-        "user": "example_user",
-        "password": smtp_data.password,
-        "password_id": smtp_data.password_id,
-        "auth_type": "plain",
-        "transport_security": "tls",
-        "domain": "domain",
-        "skip_ssl_verify": "False",
-    }
-    assert relation_data == expected_relation_data
+    smtp_data = smtp.SmtpRelationData(**smtp_data_kwargs)
+    assert smtp_data.to_relation_data() == expected_relation_data
 
 
-def test_legacy_requirer_charm_does_not_emit_event_id_when_no_data():
+def test_legacy_requirer_charm_does_not_emit_event_id_when_no_data(requirer_harness):
     """
     arrange: set up a charm with no relation data to be populated.
     act: add an smtp-legacy relation.
     assert: no events are emitted.
     """
-    harness = Harness(SmtpRequirerCharm, meta=REQUIRER_METADATA)
-    harness.begin()
-    harness.set_leader(True)
-    harness.add_relation("smtp-legacy", "smtp-provider")
-    relation = harness.charm.framework.model.get_relation("smtp-legacy", 0)
-    harness.charm.on.smtp_legacy_relation_changed.emit(relation)
-    assert len(harness.charm.events) == 0
+    requirer_harness.add_relation("smtp-legacy", "smtp-provider")
+    relation = requirer_harness.model.get_relation("smtp-legacy", 0)
+    requirer_harness.charm.on.smtp_legacy_relation_changed.emit(relation)
+    assert len(requirer_harness.charm.events) == 0
 
 
-def test_requirer_charm_does_not_emit_event_id_when_no_data():
+def test_requirer_charm_does_not_emit_event_id_when_no_data(requirer_harness):
     """
     arrange: set up a charm with no relation data to be populated.
     act: add an smtp relation.
     assert: no SmtpDataAvailable events are emitted.
     """
-    harness = Harness(SmtpRequirerCharm, meta=REQUIRER_METADATA)
-    harness.begin()
-    harness.set_leader(True)
-    harness.add_relation("smtp", "smtp-provider")
-    relation = harness.charm.framework.model.get_relation("smtp", 0)
-    harness.charm.on.smtp_legacy_relation_changed.emit(relation)
-    assert len(harness.charm.events) == 0
-
-
-@pytest.mark.parametrize("is_leader", [True, False])
-def test_legacy_requirer_charm_with_valid_relation_data_emits_event(is_leader):
-    """
-    arrange: set up a charm.
-    act: add an smtp-legacy relation.
-    assert: an SmtpDataAvailable event containing the relation data is emitted.
-    """
-    harness = Harness(SmtpRequirerCharm, meta=REQUIRER_METADATA)
-    harness.begin()
-    harness.set_leader(is_leader)
-    harness.add_relation("smtp-legacy", "smtp-provider", app_data=SAMPLE_LEGACY_RELATION_DATA)
-
-    assert len(harness.charm.events) == 1
-    assert harness.charm.events[0].host == SAMPLE_LEGACY_RELATION_DATA["host"]
-    assert harness.charm.events[0].port == int(SAMPLE_LEGACY_RELATION_DATA["port"])
-    assert harness.charm.events[0].user == SAMPLE_LEGACY_RELATION_DATA["user"]
-    assert harness.charm.events[0].password == SAMPLE_LEGACY_RELATION_DATA["password"]
-    assert harness.charm.events[0].auth_type == SAMPLE_LEGACY_RELATION_DATA["auth_type"]
-    assert (
-        harness.charm.events[0].transport_security
-        == SAMPLE_LEGACY_RELATION_DATA["transport_security"]
-    )
-    assert harness.charm.events[0].domain == SAMPLE_LEGACY_RELATION_DATA["domain"]
-    assert harness.charm.events[0].skip_ssl_verify == literal_eval(
-        SAMPLE_LEGACY_RELATION_DATA["skip_ssl_verify"]
-    )
-
-    retrieved_relation_data = harness.charm.smtp_legacy.get_relation_data()
-    assert retrieved_relation_data.host == SAMPLE_LEGACY_RELATION_DATA["host"]
-    assert retrieved_relation_data.port == int(SAMPLE_LEGACY_RELATION_DATA["port"])
-    assert retrieved_relation_data.user == SAMPLE_LEGACY_RELATION_DATA["user"]
-    assert retrieved_relation_data.password == SAMPLE_LEGACY_RELATION_DATA["password"]
-    assert retrieved_relation_data.auth_type == SAMPLE_LEGACY_RELATION_DATA["auth_type"]
-    assert (
-        retrieved_relation_data.transport_security
-        == SAMPLE_LEGACY_RELATION_DATA["transport_security"]
-    )
-    assert retrieved_relation_data.domain == SAMPLE_LEGACY_RELATION_DATA["domain"]
-    assert retrieved_relation_data.skip_ssl_verify == literal_eval(
-        SAMPLE_LEGACY_RELATION_DATA["skip_ssl_verify"]
-    )
-
-
-@pytest.mark.parametrize("is_leader", [True, False])
-def test_requirer_charm_with_valid_relation_data_emits_event(is_leader):
+    requirer_harness.add_relation("smtp", "smtp-provider")
+    relation = requirer_harness.model.get_relation("smtp", 0)
+    requirer_harness.charm.on.smtp_relation_changed.emit(relation)
+    assert len(requirer_harness.charm.events) == 0
+
+
+@pytest.mark.parametrize(
+    "relation_name, sample_data",
+    [
+        pytest.param(smtp.LEGACY_RELATION_NAME, SAMPLE_LEGACY_RELATION_DATA, id="smtp-legacy"),
+        pytest.param(smtp.DEFAULT_RELATION_NAME, SAMPLE_RELATION_DATA, id="smtp"),
+    ],
+)
+@pytest.mark.parametrize(
+    "requirer_harness", [True, False], ids=["leader", "not-leader"], indirect=True
+)
+def test_requirer_charm_with_valid_relation_data_emits_event(
+    requirer_harness, relation_name, sample_data
+):
     """
     arrange: set up a charm.
-    act: add an smtp relation.
+    act: add an smtp or smtp-legacy relation.
     assert: an SmtpDataAvailable event containing the relation data is emitted.
     """
-    harness = Harness(SmtpRequirerCharm, meta=REQUIRER_METADATA)
-    harness.begin()
-    harness.set_leader(is_leader)
-    harness.add_relation("smtp", "smtp-provider", app_data=SAMPLE_RELATION_DATA)
-
-    assert len(harness.charm.events) == 1
-    assert harness.charm.events[0].host == SAMPLE_RELATION_DATA["host"]
-    assert harness.charm.events[0].port == int(SAMPLE_RELATION_DATA["port"])
-    assert harness.charm.events[0].user == SAMPLE_RELATION_DATA["user"]
-    assert harness.charm.events[0].password_id == SAMPLE_RELATION_DATA["password_id"]
-    assert harness.charm.events[0].auth_type == SAMPLE_RELATION_DATA["auth_type"]
-    assert harness.charm.events[0].transport_security == SAMPLE_RELATION_DATA["transport_security"]
-    assert harness.charm.events[0].domain == SAMPLE_RELATION_DATA["domain"]
-    assert harness.charm.events[0].skip_ssl_verify == literal_eval(
-        SAMPLE_RELATION_DATA["skip_ssl_verify"]
-    )
+    requirer_harness.add_relation(relation_name, "smtp-provider", app_data=sample_data)
+
+    if relation_name == smtp.LEGACY_RELATION_NAME:
+        fields = (*SMTP_DATA_FIELDS, "password")
+        requirer = requirer_harness.charm.smtp_legacy
+    else:
+        fields = (*SMTP_DATA_FIELDS, "password_id")
+        requirer = requirer_harness.charm.smtp
+    expected = {
+        **sample_data,
+        "port": int(sample_data["port"]),
+        "skip_ssl_verify": False,
+    }
+    assert len(requirer_harness.charm.events) == 1
+    event = requirer_harness.charm.events[0]
+    assert {field: getattr(event, field) for field in fields} == expected
+    assert requirer.get_relation_data() == _event_to_relation_data(event)
 
 
-@pytest.mark.parametrize("is_leader", [True, False])
-def test_requirer_charm_with_invalid_relation_data_doesnt_emit_event(is_leader):
+@pytest.mark.parametrize(
+    "requirer_harness", [True, False], ids=["leader", "not-leader"], indirect=True
+)
+def test_requirer_charm_with_invalid_relation_data_doesnt_emit_event(requirer_harness):
     """
     arrange: set up a charm.
     act: add an smtp-legacy relation changed event with invalid data.
@@ -272,22 +310,16 @@ def test_requirer_charm_with_invalid_relation_data_doesnt_emit_event(is_leader):
         "skip_ssl_verify": "False",
     }
 
-    harness = Harness(SmtpRequirerCharm, meta=REQUIRER_METADATA)
-    harness.begin()
-    harness.set_leader(is_leader)
-    harness.add_relation("smtp-legacy", "smtp-provider", app_data=relation_data)
+    requirer_harness.add_relation("smtp-legacy", "smtp-provider", app_data=relation_data)
 
-    assert len(harness.charm.events) == 0
+    assert len(requirer_harness.charm.events) == 0
 
 
-def test_requirer_charm_get_relation_data_without_relation_data():
+def test_requirer_charm_get_relation_data_without_relation_data(requirer_harness):
     """
     arrange: set up a charm with smtp relation without any relation data.
     act: call get_relation_data function.
     assert: get_relation_data should return None.
     """
-    harness = Harness(SmtpRequirerCharm, meta=REQUIRER_METADATA)
-    harness.begin()
-    harness.set_leader(True)
-    harness.add_relation("smtp", "smtp-provider", app_data={})
-    assert harness.charm.smtp.get_relation_data() is None
+    requirer_harness.add_relation("smtp", "smtp-provider", app_data={})
+    assert requirer_harness.charm.smtp.get_relation_data() is None